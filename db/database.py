@@ -6,3 +6,41 @@ client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
 
 db = client["fiveg_noc"]
 users_collection = db["users"]
+
+
+async def ensure_indexes():
+    chat_messages = db["chat_messages"]
+    chat_sessions = db["chat_sessions"]
+
+    # Session history (sorted by time) and the context-window query in send_message
+    await chat_messages.create_index(
+        [("session_id", 1), ("created_at", 1)], background=True
+    )
+    await chat_messages.create_index(
+        [("session_id", 1), ("included_in_context", 1), ("created_at", -1)], background=True
+    )
+    # Paged message listing (newest first by _id)
+    await chat_messages.create_index(
+        [("session_id", 1), ("_id", -1)], background=True
+    )
+
+    # Session list per user, newest first
+    await chat_sessions.create_index(
+        [("user_id", 1), ("updated_at", -1)], background=True
+    )
+
+    # Resource listing: own uploads / common docs, and per-user hidden docs
+    await db["documents"].create_index(
+        [("doc_type", 1), ("owner_user_id", 1)], background=True
+    )
+    await db["user_hidden_docs"].create_index(
+        [("user_id", 1)], background=True
+    )
+
+    # One copy of a given file per user; legacy docs without a BLAKE3 hash are exempt
+    await db["documents"].create_index(
+        [("owner_user_id", 1), ("file_hash_b3", 1)],
+        unique=True,
+        partialFilterExpression={"doc_type": "user", "file_hash_b3": {"$exists": True}},
+        background=True,
+    )
@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import time
 import os
@@ -6,8 +5,10 @@ from datetime import datetime, timedelta
 import signal
 import threading
 import sys
+import atexit
+from typing import TextIO
 
-np.random.seed(42)
+RNG = np.random.default_rng(42)
 
 # -------------------------------
 # CITY → NODE MAPPING
@@ -33,6 +34,10 @@ cities = {
 # ✅ ABSOLUTE SAFE DATA PATH
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
 
+# Fixed (city, cell) order shared by the batched metric draw and the writer loop
+CELLS = [(city, cell) for city, cells in cities.items() for cell in cells]
+CELL_IDS = np.array([cell["cell_id"] for _, cell in CELLS])
+
 # -------------------------------
 # FAILURE WINDOWS (DAILY)
 # -------------------------------
@@ -68,93 +73,118 @@ def align_to_next_minute():
     next_minute = (now + timedelta(minutes=1)).replace(second=0, microsecond=0)
     sleep_seconds = (next_minute - now).total_seconds()
     print(f"⏳ Aligning start to {next_minute.strftime('%H:%M:%S')} ... (press Ctrl+C to cancel)")
-    # Sleep in small increments so we can abort quickly on SIGINT
-    interval = 0.5
-    end_time = time.time() + sleep_seconds
-    while time.time() < end_time:
-        if STOP_EVENT.is_set():
-            print("Alignment aborted due to shutdown request.")
-            return False
-        time.sleep(min(interval, end_time - time.time()))
+    # Single wait that returns early as soon as SIGINT sets the stop event
+    if STOP_EVENT.wait(timeout=sleep_seconds):
+        print("Alignment aborted due to shutdown request.")
+        return False
     return True
 
 
-def in_time_range(now, start, end):
-    t = now.strftime("%H:%M")
-    return start <= t <= end
-
-
 # -------------------------------
 # METRIC GENERATION
 # -------------------------------
 
-def generate_metrics(cell_id):
-    throughput = np.random.normal(160, 12)
-    latency = np.random.normal(22, 4)
-    packet_loss = np.random.normal(0.25, 0.07)
-    rsrp = np.random.normal(-85, 4)
-    users = np.random.randint(40, 110)
+# Metric columns: throughput_mbps, latency_ms, packet_loss_pct, rsrp_dbm
+LOC = np.array([160, 22, 0.25, -85])
+SCALE = np.array([12, 4, 0.07, 4])
+FLOOR = np.array([5, 5, 0])  # lower clamp for throughput, latency, packet loss
+
+PEAK_DELTA = np.array([-70, 60, 1.2, 0])
+PEAK_USERS = 80
+BACKHAUL_VALUES = np.array([10, 250, 4.5])  # throughput, latency, packet loss
+INTERFERENCE_DELTA = np.array([-50, 40, 0, -15])
+
+BACKHAUL_MASK = CELL_IDS == BACKHAUL_FAILURE_NODE
+INTERFERENCE_MASK = CELL_IDS == INTERFERENCE_NODE
 
-    now = datetime.now()
+
+def generate_all_metrics(now, is_peak, is_backhaul, is_interference):
+    """
+    Draw one sample for every cell in CELLS with a single batched RNG call.
+    The failure-window flags are evaluated once per tick by the caller.
+    Returns a list of metric dicts in CELLS order.
+    """
+    vals = RNG.normal(LOC, SCALE, size=(len(CELLS), 4))
+    users = RNG.integers(40, 110, size=len(CELLS))
 
     # (A) PEAK CONGESTION
-    if in_time_range(now, PEAK_START, PEAK_END):
-        users += 80
-        latency += 60
-        throughput -= 70
-        packet_loss += 1.2
+    if is_peak:
+        vals += PEAK_DELTA
+        users += PEAK_USERS
 
     # (B) BACKHAUL FAILURE
-    if cell_id == BACKHAUL_FAILURE_NODE and in_time_range(now, BACKHAUL_START, BACKHAUL_END):
-        throughput = 10
-        latency = 250
-        packet_loss = 4.5
+    if is_backhaul:
+        vals[BACKHAUL_MASK, :3] = BACKHAUL_VALUES
 
     # (C) RF INTERFERENCE
-    if cell_id == INTERFERENCE_NODE and in_time_range(now, INTERFERENCE_START, INTERFERENCE_END):
-        rsrp -= 15
-        latency += 40
-        throughput -= 50
-
-    return {
-        "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
-        "throughput_mbps": round(max(throughput, 5), 2),
-        "latency_ms": round(max(latency, 5), 2),
-        "packet_loss_pct": round(max(packet_loss, 0), 3),
-        "rsrp_dbm": round(rsrp, 1),
-        "users_connected": int(users)
-    }
+    if is_interference:
+        vals[INTERFERENCE_MASK] += INTERFERENCE_DELTA
+
+    vals[:, :3] = np.maximum(vals[:, :3], FLOOR)
+
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+
+    return [
+        {
+            "timestamp": timestamp,
+            "throughput_mbps": round(throughput, 2),
+            "latency_ms": round(latency, 2),
+            "packet_loss_pct": round(packet_loss, 3),
+            "rsrp_dbm": round(rsrp, 1),
+            "users_connected": u,
+        }
+        for (throughput, latency, packet_loss, rsrp), u in zip(vals.tolist(), users.tolist())
+    ]
 
 
 # -------------------------------
 # CSV WRITER (AUTO CREATION SAFE)
 # -------------------------------
 
-def write_to_csv(city, cell):
-    folder = os.path.join(BASE_DIR, city)
-    os.makedirs(folder, exist_ok=True)  # ✅ auto-create city folders
+CSV_HEADER = (
+    "timestamp,city,cell_id,latitude,longitude,"
+    "throughput_mbps,latency_ms,packet_loss_pct,rsrp_dbm,users_connected\n"
+)
 
-    filepath = os.path.join(folder, f"{cell['cell_id']}.csv")
+# Long-lived append handles, one per cell CSV (opened on first write)
+FILE_HANDLES: dict[str, TextIO] = {}
 
-    metrics = generate_metrics(cell["cell_id"])
 
-    row = {
-        "timestamp": metrics["timestamp"],
-        "city": city,
-        "cell_id": cell["cell_id"],
-        "latitude": cell["lat"],
-        "longitude": cell["lon"],
-        **metrics
-    }
+def _get_file_handle(filepath):
+    fh = FILE_HANDLES.get(filepath)
+    if fh is not None:
+        return fh
 
-    df = pd.DataFrame([row])
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)  # ✅ auto-create city folders
 
-    file_exists = os.path.exists(filepath)
+    fh = open(filepath, "a", buffering=1 << 16)
+    if os.path.getsize(filepath) == 0:
+        fh.write(CSV_HEADER)
+        print(f"📁 Created new file: {filepath}")
 
-    df.to_csv(filepath, mode="a", header=not file_exists, index=False)
+    FILE_HANDLES[filepath] = fh
+    return fh
 
-    if not file_exists:
-        print(f"📁 Created new file: {filepath}")
+
+def close_file_handles():
+    for fh in FILE_HANDLES.values():
+        fh.flush()
+        fh.close()
+    FILE_HANDLES.clear()
+
+
+atexit.register(close_file_handles)
+
+
+def write_to_csv(city, cell, m):
+    filepath = os.path.join(BASE_DIR, city, f"{cell['cell_id']}.csv")
+    fh = _get_file_handle(filepath)
+
+    fh.write(
+        f"{m['timestamp']},{city},{cell['cell_id']},{cell['lat']},{cell['lon']},"
+        f"{m['throughput_mbps']},{m['latency_ms']},{m['packet_loss_pct']},"
+        f"{m['rsrp_dbm']},{m['users_connected']}\n"
+    )
 
 
 # -------------------------------
@@ -169,29 +199,47 @@ if not align_to_next_minute():
 
 print("✅ Live data generation started...")
 
+TICK_SECONDS = 30.0
+
 try:
+    # Cadence anchored to a monotonic clock so per-cycle work doesn't accumulate drift
+    next_tick = time.monotonic()
+
     while not STOP_EVENT.is_set():
         start_cycle = datetime.now()
 
-        for city, cells in cities.items():
-            for cell in cells:
-                # stop quickly if requested
-                if STOP_EVENT.is_set():
-                    break
-                write_to_csv(city, cell)
+        # ✅ Evaluate the daily failure windows once per tick
+        hm = start_cycle.strftime("%H:%M")
+        is_peak = PEAK_START <= hm <= PEAK_END
+        is_backhaul = BACKHAUL_START <= hm <= BACKHAUL_END
+        is_interference = INTERFERENCE_START <= hm <= INTERFERENCE_END
+
+        metrics_rows = generate_all_metrics(start_cycle, is_peak, is_backhaul, is_interference)
+
+        for (city, cell), metrics in zip(CELLS, metrics_rows):
+            # stop quickly if requested
             if STOP_EVENT.is_set():
                 break
+            write_to_csv(city, cell, metrics)
+
+        # ✅ Push this cycle's rows to disk so readers see them right away
+        for fh in FILE_HANDLES.values():
+            fh.flush()
 
         # ✅ EXACT 30-SECOND INTERVAL MAINTAINED
-        elapsed = (datetime.now() - start_cycle).total_seconds()
-        sleep_time = max(0, 30 - elapsed)
-        # sleep in short slices to remain responsive to shutdown
-        end_time = time.time() + sleep_time
-        while time.time() < end_time and not STOP_EVENT.is_set():
-            time.sleep(min(0.5, end_time - time.time()))
+        next_tick += TICK_SECONDS
+        sleep_time = next_tick - time.monotonic()
+        if sleep_time < 0:
+            # Overran a whole cycle: restart the cadence instead of bursting
+            next_tick = time.monotonic()
+            sleep_time = 0
+        # wakes immediately on shutdown
+        STOP_EVENT.wait(timeout=sleep_time)
 except KeyboardInterrupt:
     # Fallback if something triggers KeyboardInterrupt directly
     print("\n⏹️ Shutdown requested (KeyboardInterrupt). Stopping generator...")
     STOP_EVENT.set()
+finally:
+    close_file_handles()
 
 print("✅ Generator stopped. Goodbye.")
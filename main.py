@@ -5,6 +5,9 @@ from routes.auth_routes import router as auth_router
 from routes.data_routes import router as data_router
 from routes.resources_routes import router as resources_router
 from rag.startup_common_embedder import embed_common_docs_on_startup
+from db.database import ensure_indexes
+from rag.vector_store import embed_texts
+from services.chat_llm import warmup_llm
 from routes.chat_routes import router as chat_router
 
 from dotenv import load_dotenv
@@ -31,4 +34,8 @@ def root():
 
 @app.on_event("startup")
 async def on_startup():
+    await ensure_indexes()
+    # Pay kernel selection / thread-pool spin-up now, not on the first user query
+    embed_texts(["warmup"])
+    await warmup_llm()
     await embed_common_docs_on_startup()
@@ -1,11 +1,37 @@
-def chunk_text(text: str, chunk_size=500, overlap=100):
+import re
+
+# Split after sentence-ending punctuation or at blank lines
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+
+def chunk_text(text: str, chunk_size=500):
+    """
+    Pack whole sentences into chunks of at most chunk_size characters,
+    without overlap. Sentences longer than chunk_size are split into
+    chunk_size windows.
+    """
     chunks = []
-    start = 0
+    current = ""
+
+    for sentence in _SENTENCE_BOUNDARY.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+
+        if current and len(current) + 1 + len(sentence) <= chunk_size:
+            current += " " + sentence
+            continue
+
+        if current:
+            chunks.append(current)
+            current = ""
+
+        while len(sentence) > chunk_size:
+            chunks.append(sentence[:chunk_size])
+            sentence = sentence[chunk_size:]
+        current = sentence
 
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start += chunk_size - overlap
+    if current:
+        chunks.append(current)
 
     return chunks
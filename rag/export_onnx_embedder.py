@@ -0,0 +1,41 @@
+"""
+One-time export of the embedding model to an INT8 quantized ONNX file.
+
+Run from the backend root:
+    python -m rag.export_onnx_embedder
+
+Requires: optimum[onnxruntime], onnxruntime, transformers.
+rag/vector_store.py picks the exported model up automatically on next start.
+"""
+import os
+
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from optimum.onnxruntime import ORTModelForFeatureExtraction
+from transformers import AutoTokenizer
+
+HF_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Must match ONNX_MODEL_DIR / ONNX_MODEL_FILE in rag/vector_store.py
+ONNX_MODEL_DIR = "./vector_store/onnx/all-MiniLM-L6-v2"
+ONNX_MODEL_FILE = "model.int8.onnx"
+
+
+def export_onnx_embedder():
+    os.makedirs(ONNX_MODEL_DIR, exist_ok=True)
+
+    model = ORTModelForFeatureExtraction.from_pretrained(HF_MODEL_ID, export=True)
+    model.save_pretrained(ONNX_MODEL_DIR)
+    AutoTokenizer.from_pretrained(HF_MODEL_ID).save_pretrained(ONNX_MODEL_DIR)
+
+    # INT8 weights, FP32 activations
+    quantize_dynamic(
+        os.path.join(ONNX_MODEL_DIR, "model.onnx"),
+        os.path.join(ONNX_MODEL_DIR, ONNX_MODEL_FILE),
+        weight_type=QuantType.QInt8,
+    )
+
+    print(f"✅ Exported INT8 embedder to {ONNX_MODEL_DIR}/{ONNX_MODEL_FILE}")
+
+
+if __name__ == "__main__":
+    export_onnx_embedder()
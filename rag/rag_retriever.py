@@ -1,7 +1,18 @@
-from rag.vector_store import collection, embed_texts
+from bson import ObjectId
+from cachetools import TTLCache
+
+from rag.vector_store import collection, embed_texts_async
 from db.database import db
 
 documents = db["documents"]
+chat_sessions = db["chat_sessions"]
+
+# doc_id -> filename for retrieved chunks
+_filename_cache: TTLCache = TTLCache(maxsize=4096, ttl=300)
+
+
+def invalidate_filename_cache(doc_id: str):
+    _filename_cache.pop(doc_id, None)
 
 
 async def retrieve_docs_for_user(
@@ -16,17 +27,36 @@ async def retrieve_docs_for_user(
     ✅ Returns filename + text for tooltip display
     """
 
-    # 1️⃣ Get session to know which docs are allowed
-    from db.database import db
-    chat_sessions = db["chat_sessions"]
-    session = await chat_sessions.find_one({"_id": session_id})
-
-
-    if not session:
+    # 1️⃣ Get session (allowed docs) + filenames of the selected docs in one round trip
+    pipeline = [
+        {"$match": {"_id": session_id}},
+        {"$lookup": {
+            "from": "documents",
+            # selected_docs holds string ids; documents are keyed by ObjectId
+            "let": {"ids": {"$map": {
+                "input": {"$ifNull": ["$selected_docs", []]},
+                "as": "d",
+                "in": {"$convert": {"input": "$$d", "to": "objectId", "onError": None}},
+            }}},
+            "pipeline": [
+                {"$match": {"$expr": {"$in": ["$_id", "$$ids"]}}},
+                {"$project": {"filename": 1}},
+            ],
+            "as": "docs",
+        }},
+        {"$project": {"selected_docs": 1, "docs": 1}},
+    ]
+    sessions = await chat_sessions.aggregate(pipeline).to_list(1)
+
+    if not sessions:
         return []
 
+    session = sessions[0]
     allowed_doc_ids = session.get("selected_docs", [])
 
+    for d in session.get("docs", []):
+        _filename_cache[str(d["_id"])] = d["filename"]
+
     # ✅ If user selected nothing → fallback to all visible docs
     doc_filter = (
         {"doc_id": {"$in": allowed_doc_ids}}
@@ -35,7 +65,7 @@ async def retrieve_docs_for_user(
     )
 
     # 2️⃣ Embed the query
-    query_emb = embed_texts([query])[0]
+    query_emb = await embed_texts_async(query)
 
     # 3️⃣ Chroma Search
     results = collection.query(
@@ -44,25 +74,37 @@ async def retrieve_docs_for_user(
         where=doc_filter,
     )
 
-    if not results["documents"]:
+    if not results["documents"] or not results["documents"][0]:
         return []
 
-    docs = []
+    metadatas = results["metadatas"][0]
+
+    # ✅ Fetch filenames for UI tooltip (cached / prefilled above, misses in one round trip)
+    doc_ids = {m.get("doc_id") for m in metadatas if m.get("doc_id")}
+    missing = [i for i in doc_ids if i not in _filename_cache and ObjectId.is_valid(i)]
 
-    for i in range(len(results["documents"][0])):
-        metadata = results["metadatas"][0][i]
-        doc_id = metadata.get("doc_id")
+    if missing:
+        cursor = documents.find(
+            {"_id": {"$in": [ObjectId(i) for i in missing]}},
+            {"filename": 1}
+        )
+        async for d in cursor:
+            _filename_cache[str(d["_id"])] = d["filename"]
 
-        # ✅ Fetch filename for UI tooltip
-        doc_meta = await documents.find_one({"_id": doc_id})
-        filename = doc_meta["filename"] if doc_meta else "Unknown"
+    name_by_id = {i: _filename_cache.get(i) for i in doc_ids}
+
+    distances = results["distances"][0] if results.get("distances") else None
+
+    docs = []
+
+    for i, text in enumerate(results["documents"][0]):
+        doc_id = metadatas[i].get("doc_id")
 
         docs.append({
-            "text": results["documents"][0][i],
+            "text": text,
             "doc_id": doc_id,
-            "filename": filename,
-            "score": results["distances"][0][i] if "distances" in results else None
+            "filename": name_by_id.get(doc_id) or "Unknown",
+            "score": distances[i] if distances else None
         })
 
     return docs
-
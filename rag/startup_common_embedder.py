@@ -1,4 +1,5 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from bson import ObjectId
 from datetime import datetime
 
@@ -6,12 +7,22 @@ from db.database import db
 from rag.text_extractor import extract_text_from_file
 from rag.chunker import chunk_text
 from rag.vector_store import collection, embed_texts
-from routes.resources_routes import compute_file_hash
+from routes.resources_routes import compute_file_hash, find_document_by_hash
 
 documents = db["documents"]
 
 BASE_COMMON_DIR = "./resources/common"
 
+# Stay under Chroma's per-call insert limit when many docs are new
+CHROMA_ADD_BATCH = 5000
+
+# Parallel text extraction across common docs (parsers release the GIL in C code)
+EXTRACT_WORKERS = 4
+
+
+def _extract_and_chunk(path: str) -> list[str]:
+    return chunk_text(extract_text_from_file(path))
+
 
 async def embed_common_docs_on_startup():
     if not os.path.exists(BASE_COMMON_DIR):
@@ -19,6 +30,10 @@ async def embed_common_docs_on_startup():
         print("📁 Created common resources directory")
         return
 
+    # 1️⃣ Find common docs not embedded yet
+    to_embed = []
+    seen_hashes = set()
+
     for filename in os.listdir(BASE_COMMON_DIR):
         path = os.path.join(BASE_COMMON_DIR, filename)
 
@@ -27,45 +42,75 @@ async def embed_common_docs_on_startup():
 
         file_hash = compute_file_hash(path)
 
-        existing = await documents.find_one({
-            "doc_type": "common",
-            "file_hash": file_hash
-        })
+        if file_hash in seen_hashes:
+            continue
+        seen_hashes.add(file_hash)
+
+        existing = await find_document_by_hash(
+            {"doc_type": "common"}, path, file_hash
+        )
 
         if existing:
             continue  # ✅ Already embedded
 
         print(f"📥 Embedding common doc: {filename}")
+        to_embed.append((filename, path, file_hash))
 
-        text = extract_text_from_file(path)
-        chunks = chunk_text(text)
-        embeddings = embed_texts(chunks)
-
-        doc_id = str(ObjectId())
+    if not to_embed:
+        return
 
+    # Extract + chunk files concurrently, one file per worker
+    with ThreadPoolExecutor(max_workers=min(EXTRACT_WORKERS, len(to_embed))) as ex:
+        chunk_lists = list(ex.map(_extract_and_chunk, [path for _, path, _ in to_embed]))
+
+    pending = [
+        (filename, path, file_hash, str(ObjectId()), chunks)
+        for (filename, path, file_hash), chunks in zip(to_embed, chunk_lists)
+    ]
+
+    # 2️⃣ Embed all chunks in one batch
+    all_chunks = []
+    ids = []
+    metadatas = []
+
+    for _, _, _, doc_id, chunks in pending:
+        all_chunks.extend(chunks)
+        ids.extend(f"{doc_id}_{i}" for i in range(len(chunks)))
+        metadatas.extend([
+            {
+                "doc_id": doc_id,
+                "user_id": "COMMON",
+                "doc_type": "common"
+            }
+        ] * len(chunks))
+
+    embeddings = embed_texts(all_chunks, batch_size=64)
+
+    # 3️⃣ Bulk insert into Chroma
+    for start in range(0, len(all_chunks), CHROMA_ADD_BATCH):
+        end = start + CHROMA_ADD_BATCH
         collection.add(
-            documents=chunks,
-            embeddings=embeddings,
-            ids=[f"{doc_id}_{i}" for i in range(len(chunks))],
-            metadatas=[
-                {
-                    "doc_id": doc_id,
-                    "user_id": "COMMON",
-                    "doc_type": "common"
-                }
-                for _ in range(len(chunks))
-            ]
+            documents=all_chunks[start:end],
+            embeddings=embeddings[start:end],
+            ids=ids[start:end],
+            metadatas=metadatas[start:end]
         )
 
-        await documents.insert_one({
+    # 4️⃣ Bulk insert metadata into Mongo
+    await documents.insert_many([
+        {
             "_id": ObjectId(doc_id),
             "filename": filename,
             "doc_type": "common",
             "owner_user_id": None,
             "path": path,
             "size_kb": round(os.path.getsize(path) / 1024, 1),
-            "file_hash": file_hash,
+            "file_hash_b3": file_hash,
+            "chunk_count": len(chunks),
             "uploaded_at": datetime.utcnow().isoformat()
-        })
+        }
+        for filename, path, file_hash, doc_id, chunks in pending
+    ])
 
+    for filename, *_ in pending:
         print(f"✅ Embedded & stored: {filename}")
@@ -1,20 +1,51 @@
+import os
+import subprocess
+
 import pdfplumber
 from pypdf import PdfReader
 
+# Optional poppler fast path: set USE_PDFTOTEXT=1 when pdftotext is installed
+USE_PDFTOTEXT = os.getenv("USE_PDFTOTEXT") == "1"
+
+# Pages where pypdf yields less text than this get a pdfplumber retry
+MIN_PAGE_CHARS = 20
+
+
+def _extract_with_pdftotext(path: str) -> str:
+    result = subprocess.run(
+        ["pdftotext", "-enc", "UTF-8", path, "-"],
+        capture_output=True,
+        check=True,
+    )
+    return result.stdout.decode("utf-8", errors="ignore")
+
 
 def extract_text_from_pdf(path: str) -> str:
-    text = ""
+    if USE_PDFTOTEXT:
+        try:
+            return _extract_with_pdftotext(path)
+        except (OSError, subprocess.CalledProcessError):
+            pass  # fall through to the Python extractors
 
+    # Fast path: pypdf for plain text PDFs
     try:
-        with pdfplumber.open(path) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text() or ""
-    except:
         reader = PdfReader(path)
-        for page in reader.pages:
-            text += page.extract_text() or ""
+        texts = [page.extract_text() or "" for page in reader.pages]
+    except Exception:
+        with pdfplumber.open(path) as pdf:
+            return "".join(page.extract_text() or "" for page in pdf.pages)
+
+    # Slow path: pdfplumber layout analysis only for near-empty pages
+    sparse = [i for i, t in enumerate(texts) if len(t.strip()) < MIN_PAGE_CHARS]
+    if sparse:
+        try:
+            with pdfplumber.open(path) as pdf:
+                for i in sparse:
+                    texts[i] = pdf.pages[i].extract_text() or texts[i]
+        except Exception:
+            pass
 
-    return text
+    return "".join(texts)
 
 
 def extract_text_from_file(path: str) -> str:
@@ -1,30 +1,264 @@
 import os
+import asyncio
+import numpy as np
 import chromadb
+from cachetools import LRUCache
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+
+# Keep tokenizer/BLAS threads from oversubscribing alongside FastAPI's worker threads
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+EMBED_NUM_THREADS = min(4, os.cpu_count() or 1)
 
 VECTOR_DIR = "./vector_store/chroma_db"
 
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# INT8 ONNX export of the embedding model (see rag/export_onnx_embedder.py)
+ONNX_MODEL_DIR = "./vector_store/onnx/all-MiniLM-L6-v2"
+ONNX_MODEL_FILE = "model.int8.onnx"
+
+# Query micro-batching: concurrent requests arriving within the window share one encode
+EMBED_BATCH_SIZE = 32
+EMBED_BATCH_WINDOW_S = 0.005
+
+# Repeated queries (dashboard retries etc.) skip the model entirely
+QUERY_CACHE_SIZE = 1024
+
 # ✅ Persistent Chroma Client (NEW API)
 chroma_client = chromadb.PersistentClient(path=VECTOR_DIR)
 
+COLLECTION_NAME = "knowledge_chunks"
+
+# Cosine distance on L2-normalized embeddings + tuned HNSW graph
+HNSW_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 64,
+}
+
+# Rows copied per add() when rebuilding the collection
+MIGRATION_BATCH = 5000
+
+# The rebuild is copied here first, so the live collection survives a failed copy
+REBUILD_COLLECTION_NAME = f"{COLLECTION_NAME}_rebuild"
+
+
+def _collection_names() -> set[str]:
+    # Older chromadb returns Collection objects, newer returns plain names
+    return {getattr(c, "name", c) for c in chroma_client.list_collections()}
+
+
+def _open_collection():
+    """
+    Open the chunk collection, rebuilding it once if it was created with
+    different index settings (HNSW parameters are fixed at creation time).
+    The copy goes into a temporary collection; the old one is only dropped
+    after every batch is in, then the copy is renamed into its place.
+    """
+    names = _collection_names()
+
+    if REBUILD_COLLECTION_NAME in names:
+        if COLLECTION_NAME not in names:
+            # Died after dropping the old collection: the copy is complete
+            rebuilt = chroma_client.get_collection(REBUILD_COLLECTION_NAME)
+            rebuilt.modify(name=COLLECTION_NAME)
+            return rebuilt
+        # Died mid-copy: the original is intact, discard the partial copy
+        chroma_client.delete_collection(REBUILD_COLLECTION_NAME)
+
+    if COLLECTION_NAME not in names:
+        return chroma_client.create_collection(name=COLLECTION_NAME, metadata=HNSW_METADATA)
+
+    existing = chroma_client.get_collection(COLLECTION_NAME)
+    current = existing.metadata or {}
+
+    if all(current.get(k) == v for k, v in HNSW_METADATA.items()):
+        return existing
+
+    if existing.count() == 0:
+        # Nothing to migrate, just recreate with the right settings
+        chroma_client.delete_collection(COLLECTION_NAME)
+        return chroma_client.create_collection(name=COLLECTION_NAME, metadata=HNSW_METADATA)
+
+    print("🔁 Rebuilding vector collection with cosine HNSW index...")
+
+    data = existing.get(include=["embeddings", "documents", "metadatas"])
+    rebuilt = chroma_client.create_collection(
+        name=REBUILD_COLLECTION_NAME, metadata=HNSW_METADATA
+    )
+
+    for start in range(0, len(data["ids"]), MIGRATION_BATCH):
+        end = start + MIGRATION_BATCH
+        rebuilt.add(
+            ids=data["ids"][start:end],
+            embeddings=data["embeddings"][start:end],
+            documents=data["documents"][start:end],
+            metadatas=data["metadatas"][start:end],
+        )
+
+    chroma_client.delete_collection(COLLECTION_NAME)
+    rebuilt.modify(name=COLLECTION_NAME)
+    return rebuilt
+
+
 # ✅ Collection
-collection = chroma_client.get_or_create_collection(
-    name="knowledge_chunks"
-)
+collection = _open_collection()
+
+
+class OnnxEmbedder:
+    """
+    Drop-in replacement for SentenceTransformer.encode backed by an INT8
+    quantized ONNX Runtime session. Mean-pools token embeddings and
+    L2-normalizes, matching the all-MiniLM-L6-v2 sentence-transformers pipeline.
+    """
+
+    def __init__(self, model_dir: str, model_file: str = ONNX_MODEL_FILE, max_length: int = 256):
+        from onnxruntime import InferenceSession, SessionOptions
+        from transformers import AutoTokenizer
 
-# ✅ Load Local Embedding Model (FAST + ACCURATE)
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+        options = SessionOptions()
+        options.intra_op_num_threads = EMBED_NUM_THREADS
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = InferenceSession(
+            os.path.join(model_dir, model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.max_length = max_length
+
+    def encode(self, texts: list[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # Bucket similar-length texts together so batches carry little padding
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        sorted_texts = [texts[i] for i in order]
+        batches = []
+
+        for start in range(0, len(sorted_texts), batch_size):
+            encoded = self.tokenizer(
+                sorted_texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            inputs = {k: v for k, v in encoded.items() if k in self.input_names}
+            token_embeddings = self.session.run(None, inputs)[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            batches.append(pooled / np.clip(norms, 1e-12, None))
+
+        embeddings = np.empty((len(texts), batches[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.vstack(batches)
+        return embeddings
+
+
+def _load_embedding_model():
+    if os.path.exists(os.path.join(ONNX_MODEL_DIR, ONNX_MODEL_FILE)):
+        try:
+            return OnnxEmbedder(ONNX_MODEL_DIR)
+        except ImportError:
+            print("⚠️ onnxruntime/transformers not installed, using PyTorch embedder")
+
+    # Imported here so the ONNX path never loads the PyTorch stack
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(EMBED_NUM_THREADS)
+    return SentenceTransformer(EMBED_MODEL_NAME)
+
+
+# ✅ Load Local Embedding Model (INT8 ONNX if exported, else PyTorch)
+embedding_model = _load_embedding_model()
 
 # ✅ Local Embedding Function
-def embed_texts(texts: list[str]):
+def embed_texts(texts: list[str], batch_size: int = 32) -> np.ndarray:
+    """
+    Returns a contiguous (len(texts), dim) float32 array; Chroma takes it as-is,
+    which avoids boxing every value into a Python float.
+    """
     if not texts:
-        return []
+        return np.empty((0, 0), dtype=np.float32)
 
     embeddings = embedding_model.encode(
         texts,
+        batch_size=batch_size,
         convert_to_numpy=True,
+        normalize_embeddings=True,
         show_progress_bar=False
     )
 
-    return embeddings.tolist()
\ No newline at end of file
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+# ✅ Micro-batched single-text embedding for concurrent chat queries
+_embed_queue: asyncio.Queue | None = None
+_embed_worker: asyncio.Task | None = None
+_query_embedding_cache: LRUCache = LRUCache(maxsize=QUERY_CACHE_SIZE)
+
+
+async def _embed_batch_worker(queue: asyncio.Queue):
+    loop = asyncio.get_running_loop()
+
+    while True:
+        text, fut = await queue.get()
+        texts, futs = [text], [fut]
+
+        # Drain whatever else arrives within the batching window
+        deadline = loop.time() + EMBED_BATCH_WINDOW_S
+        while len(texts) < EMBED_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                text, fut = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            texts.append(text)
+            futs.append(fut)
+
+        try:
+            embeddings = await asyncio.to_thread(
+                embedding_model.encode,
+                texts,
+                batch_size=EMBED_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+        except Exception as e:
+            for f in futs:
+                if not f.done():
+                    f.set_exception(e)
+            continue
+
+        for f, emb in zip(futs, embeddings):
+            if not f.done():
+                f.set_result(emb.tolist())
+
+
+async def embed_texts_async(text: str) -> list[float]:
+    global _embed_queue, _embed_worker
+
+    cached = _query_embedding_cache.get(text)
+    if cached is not None:
+        return list(cached)
+
+    if _embed_worker is None or _embed_worker.done():
+        _embed_queue = asyncio.Queue()
+        _embed_worker = asyncio.create_task(_embed_batch_worker(_embed_queue))
+
+    fut = asyncio.get_running_loop().create_future()
+    await _embed_queue.put((text, fut))
+    embedding = await fut
+
+    _query_embedding_cache[text] = tuple(embedding)
+    return embedding
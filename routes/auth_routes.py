@@ -1,11 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends
+import asyncio
 from datetime import datetime
 from pydantic import BaseModel
 
 from models.models import UserCreate, UserLogin, Token
 from db.database import users_collection
 from utils.auth_utils import hash_password, verify_password, create_access_token
-from services.dependencies import get_current_user
+from services.dependencies import get_current_user, invalidate_user_cache
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -24,7 +25,7 @@ async def register(user: UserCreate):
     user_doc = {
         "name": user.name,
         "email": user.email,
-        "hashed_password": hash_password(user.password),
+        "hashed_password": await asyncio.to_thread(hash_password, user.password),
         "role": "operator",
         "created_at": datetime.utcnow(),
     }
@@ -38,7 +39,9 @@ async def register(user: UserCreate):
 @router.post("/login", response_model=Token)
 async def login(user: UserLogin):
     db_user = await get_user_by_email(user.email)
-    if not db_user or not verify_password(user.password, db_user["hashed_password"]):
+    if not db_user or not await asyncio.to_thread(
+        verify_password, user.password, db_user["hashed_password"]
+    ):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     token = create_access_token(
@@ -70,14 +73,17 @@ async def change_password(
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not verify_password(payload.old_password, db_user["hashed_password"]):
+    if not await asyncio.to_thread(
+        verify_password, payload.old_password, db_user["hashed_password"]
+    ):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
 
-    new_hashed = hash_password(payload.new_password)
+    new_hashed = await asyncio.to_thread(hash_password, payload.new_password)
 
     await users_collection.update_one(
         {"_id": db_user["_id"]},
         {"$set": {"hashed_password": new_hashed}}
     )
+    invalidate_user_cache(db_user["email"])
 
     return {"message": "Password updated successfully"}
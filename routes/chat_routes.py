@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from datetime import datetime
 from bson import ObjectId
 from pydantic import BaseModel
+from pymongo import UpdateMany
 from typing import List
 
 from db.database import db
 from services.dependencies import get_current_user
-from services.chat_llm import llm, build_system_prompt
+from services.chat_llm import astream_with_read_timeout, build_system_prompt
 from rag.rag_retriever import retrieve_docs_for_user
 from services.analyst_context import build_network_summary
 from utils.message_utils import compress_message
@@ -18,6 +19,11 @@ router = APIRouter(prefix="/chat", tags=["Chat"])
 chat_sessions = db["chat_sessions"]
 chat_messages = db["chat_messages"]
 
+DEFAULT_SESSION_TITLES = {
+    "knowledge": "5G Knowledge Chat",
+    "analyst": "5G Analyst Chat",
+}
+
 
 # --------------------------
 # Helpers
@@ -84,9 +90,7 @@ async def create_session(
     doc = {
         "user_id": current_user.id,
         "type": payload.type,
-        "title": payload.title or (
-            "5G Knowledge Chat" if payload.type == "knowledge" else "5G Analyst Chat"
-        ),
+        "title": payload.title or DEFAULT_SESSION_TITLES[payload.type],
         "selected_docs": [],   # ✅ PER SESSION DOC FILTER
         "created_at": datetime.utcnow().isoformat(),
         "updated_at": datetime.utcnow().isoformat(),
@@ -112,16 +116,37 @@ async def create_session(
 @router.get("/sessions/{session_id}/messages")
 async def get_session_messages(
     session_id: str,
+    limit: int = Query(100, ge=1, le=500),
+    before: str | None = None,
     current_user=Depends(get_current_user)
 ):
+    """
+    Returns up to `limit` messages, oldest first. To page further back,
+    pass the id of the oldest returned message as `before`.
+    """
     oid = safe_object_id(session_id)
 
     session = await chat_sessions.find_one({"_id": oid})
     if not session or session["user_id"] != current_user.id:
         raise HTTPException(status_code=404, detail="Session not found")
 
+    filt: dict = {"session_id": session_id}
+    if before:
+        if not ObjectId.is_valid(before):
+            raise HTTPException(status_code=400, detail="Invalid message ID")
+        filt["_id"] = {"$lt": ObjectId(before)}
+
+    projection = {
+        "role": 1,
+        "content": 1,
+        "short_content": 1,
+        "included_in_context": 1,
+        "created_at": 1,
+        "sources": 1,
+    }
+
     msgs: list[dict] = []
-    async for m in chat_messages.find({"session_id": session_id}).sort("created_at", 1):
+    async for m in chat_messages.find(filt, projection).sort("_id", -1).limit(limit):
         msgs.append({
             "id": str(m["_id"]),
             "role": m["role"],
@@ -132,6 +157,9 @@ async def get_session_messages(
             "sources": m.get("sources", [])   # ✅✅✅ REQUIRED FOR TOOLTIP
         })
 
+    # Fetched newest first; return oldest→newest
+    msgs.reverse()
+
     return msgs
 
 
@@ -152,14 +180,20 @@ async def update_memory(
     if not session or session["user_id"] != current_user.id:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    include_set = set(payload.included_message_ids)
+    include_ids = [
+        ObjectId(x) for x in set(payload.included_message_ids) if ObjectId.is_valid(x)
+    ]
 
-    async for m in chat_messages.find({"session_id": session_id}):
-        flag = str(m["_id"]) in include_set
-        await chat_messages.update_one(
-            {"_id": m["_id"]},
-            {"$set": {"included_in_context": flag}}
-        )
+    await chat_messages.bulk_write([
+        UpdateMany(
+            {"session_id": session_id, "_id": {"$in": include_ids}},
+            {"$set": {"included_in_context": True}}
+        ),
+        UpdateMany(
+            {"session_id": session_id, "_id": {"$nin": include_ids}},
+            {"$set": {"included_in_context": False}}
+        ),
+    ])
 
     return {"message": "Memory selection updated"}
 
@@ -198,10 +232,8 @@ async def send_message(
     }
     await chat_messages.insert_one(user_msg_doc)
 
-    # ✅ AUTO-TITLE ONLY ON FIRST USER MESSAGE
-    msg_count = await chat_messages.count_documents({"session_id": session_id})
-
-    if msg_count == 1:
+    # ✅ AUTO-TITLE WHILE THE SESSION STILL HAS ITS DEFAULT TITLE
+    if session.get("title") in DEFAULT_SESSION_TITLES.values():
         auto_title = compress_message(payload.message)[:50]
         await chat_sessions.update_one(
             {"_id": oid},
@@ -278,7 +310,7 @@ async def send_message(
         async def token_stream():
             full_answer = ""
 
-            for chunk in llm.stream(final_prompt):
+            async for chunk in astream_with_read_timeout(final_prompt):
                 if chunk.content:
                     full_answer += chunk.content
                     yield chunk.content
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
+import asyncio
 import os
-import pandas as pd
+
+from utils.csv_utils import tail_csv
 
 # from dependencies import get_current_user   ✅ enable later to protect routes
 
@@ -20,7 +22,6 @@ def get_nodes(city: str):
 
 
 @router.get("/node-data/{city}/{node}")
-def get_node_data(city: str, node: str):
+async def get_node_data(city: str, node: str):
     filepath = os.path.join(BASE_DATA_DIR, city, node)
-    df = pd.read_csv(filepath)
-    return df.tail(200).to_dict(orient="records")
+    return await asyncio.to_thread(tail_csv, filepath, 200)
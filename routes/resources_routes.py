@@ -1,15 +1,21 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from datetime import datetime
+from datetime import datetime, timedelta
+import asyncio
+import io
 import os
 import shutil
+import tempfile
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 import hashlib
+import blake3
 
 from db.database import db
 from services.dependencies import get_current_user
 from rag.vector_store import collection, embed_texts
 from rag.text_extractor import extract_text_from_file
 from rag.chunker import chunk_text
+from rag.rag_retriever import invalidate_filename_cache
 
 router = APIRouter(prefix="/resources", tags=["Resources"])
 
@@ -20,6 +26,9 @@ BASE_COMMON_DIR = "./resources/common"
 BASE_USER_DIR = "./resources/users"
 ALLOWED_EXTENSIONS = {".pdf", ".txt", ".md"}
 MAX_FILE_SIZE_MB = 10
+HASH_BLOCK_SIZE = 1 << 20
+# An upload still "indexing" after this long died mid-way (worker killed/reloaded)
+STALE_CLAIM_AGE = timedelta(minutes=30)
 
 def validate_file(file: UploadFile):
     ext = os.path.splitext(file.filename)[1].lower()
@@ -41,38 +50,166 @@ def validate_file(file: UploadFile):
             detail="File exceeds 10MB limit"
         )
 
+    return size_mb
+
 def compute_file_hash(path: str):
-    sha256 = hashlib.sha256()
-    with open(path, "rb") as f:
-        for block in iter(lambda: f.read(4096), b""):
-            sha256.update(block)
-    return sha256.hexdigest()
+    # BLAKE3 over a memory-mapped file (multithreaded, SIMD tree hashing)
+    hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+    hasher.update_mmap(path)
+    return hasher.hexdigest()
+
+
+def hash_stream(src, hasher):
+    # Hash a seekable binary stream in 1 MiB blocks and rewind it for reuse
+    src.seek(0)
+    for block in iter(lambda: src.read(HASH_BLOCK_SIZE), b""):
+        hasher.update(block)
+    src.seek(0)
+    return hasher.hexdigest()
+
+
+def compute_upload_hash(src):
+    return hash_stream(src, blake3.blake3(max_threads=blake3.blake3.AUTO))
+
+
+def compute_legacy_file_hash(source):
+    # SHA-256 hash stored as "file_hash" by documents indexed before BLAKE3
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return hash_stream(f, hashlib.sha256())
+    return hash_stream(source, hashlib.sha256())
+
+
+def _disk_fileno(src):
+    # fileno() of an upload already backed by a real file, else None.
+    # Never call fileno() on an in-memory SpooledTemporaryFile: it forces a rollover.
+    # Relies on a CPython implementation detail: tempfile.SpooledTemporaryFile sets
+    # the private `_rolled` flag to True once its data moved to a real temp file.
+    # If that attribute is missing the state is unknown, so fall back to copyfileobj.
+    if isinstance(src, tempfile.SpooledTemporaryFile):
+        if getattr(src, "_rolled", None) is not True:
+            return None
+    try:
+        return src.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def _save_sync(src, path: str):
+    src.seek(0)
+    fd = _disk_fileno(src)
+
+    with open(path, "wb") as buffer:
+        if fd is not None and hasattr(os, "sendfile"):
+            # Kernel-side copy: no user-space buffers, a handful of syscalls
+            size = os.fstat(fd).st_size
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(buffer.fileno(), fd, offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        else:
+            shutil.copyfileobj(src, buffer, HASH_BLOCK_SIZE)
+
+
+def _extract_chunks_sync(path: str) -> list[str]:
+    return chunk_text(extract_text_from_file(path))
+
+
+def _remove_file_sync(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+async def find_document_by_hash(query: dict, source, file_hash: str):
+    """
+    Look up a document by its BLAKE3 hash ("file_hash_b3").
+    `source` (a path or a seekable binary stream) is only read again when a
+    legacy SHA-256 comparison is needed.
+    Documents stored before the switch only carry the SHA-256 "file_hash";
+    they are matched on that instead and backfilled with the BLAKE3 hash.
+    """
+    existing = await documents.find_one({**query, "file_hash_b3": file_hash})
+    if existing:
+        return existing
+
+    # Only pay for the SHA-256 pass while un-migrated documents remain
+    has_legacy = await documents.find_one(
+        {**query, "file_hash_b3": {"$exists": False}},
+        {"_id": 1}
+    )
+    if not has_legacy:
+        return None
+
+    legacy = await documents.find_one({
+        **query,
+        "file_hash": await asyncio.to_thread(compute_legacy_file_hash, source),
+        "file_hash_b3": {"$exists": False}
+    })
+    if legacy:
+        await documents.update_one(
+            {"_id": legacy["_id"]},
+            {"$set": {"file_hash_b3": file_hash}}
+        )
+
+    return legacy
+
+
+async def release_stale_claims(user_id: str, file_hash: str):
+    """
+    Drop this user's "indexing" claims on file_hash that are older than
+    STALE_CLAIM_AGE, with any chunks they already added, so the file can be
+    uploaded again. In-process failures clean up after themselves; this covers
+    uploads whose worker died before it could.
+    """
+    stale = await documents.find(
+        {
+            "owner_user_id": user_id,
+            "file_hash_b3": file_hash,
+            "status": "indexing",
+            # Claims made before claimed_at existed can only be abandoned ones
+            "$or": [
+                {"claimed_at": {"$lt": datetime.utcnow() - STALE_CLAIM_AGE}},
+                {"claimed_at": {"$exists": False}},
+            ],
+        },
+        {"_id": 1}
+    ).to_list(length=None)
+
+    for doc in stale:
+        await asyncio.to_thread(collection.delete, where={"doc_id": str(doc["_id"])})
+        await documents.delete_one({"_id": doc["_id"], "status": "indexing"})
+
 
 # ✅ GET ALL DOCS FOR USER
 @router.get("/")
 async def get_resources(current_user=Depends(get_current_user)):
     user_id = current_user.id
 
-    hidden = await hidden_docs.find({"user_id": user_id}).to_list(1000)
-    hidden_ids = [h["doc_id"] for h in hidden]
-
-    docs = []
-
-    async for doc in documents.find():
-        if doc["doc_type"] == "common" and str(doc["_id"]) in hidden_ids:
-            continue
-        if doc["doc_type"] == "user" and doc["owner_user_id"] != user_id:
-            continue
+    hidden = await hidden_docs.find({"user_id": user_id}, {"doc_id": 1}).to_list(length=None)
+    hidden_ids = [ObjectId(h["doc_id"]) for h in hidden if ObjectId.is_valid(h["doc_id"])]
+
+    # ✅ Own uploads + common docs not hidden by this user, filtered server-side
+    cursor = documents.find(
+        {"$or": [
+            # Uploads still being indexed are not listed until they finish
+            {"doc_type": "user", "owner_user_id": user_id, "status": {"$ne": "indexing"}},
+            {"doc_type": "common", "_id": {"$nin": hidden_ids}},
+        ]},
+        {"filename": 1, "doc_type": 1, "size_kb": 1, "uploaded_at": 1}
+    )
 
-        docs.append({
+    return [
+        {
             "id": str(doc["_id"]),
             "filename": doc["filename"],
             "doc_type": doc["doc_type"],
             "size_kb": doc.get("size_kb"),
             "uploaded_at": doc.get("uploaded_at")
-        })
-
-    return docs
+        }
+        for doc in await cursor.to_list(length=None)
+    ]
 
 
 # ✅ UPLOAD DOC
@@ -81,63 +218,84 @@ async def upload_resource(
     file: UploadFile = File(...),
     current_user=Depends(get_current_user)
 ):
-    validate_file(file)
+    size_mb = validate_file(file)
     user_id = current_user.id
 
     user_folder = os.path.join(BASE_USER_DIR, user_id)
-    os.makedirs(user_folder, exist_ok=True)
+    await asyncio.to_thread(os.makedirs, user_folder, exist_ok=True)
 
     file_path = os.path.join(user_folder, file.filename)
 
-    # ✅ 1. SAVE FILE FIRST
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # ✅ 1. HASH THE UPLOAD STREAM (already spooled by FastAPI) BEFORE TOUCHING DISK
+    file_hash = await asyncio.to_thread(compute_upload_hash, file.file)
 
-    # ✅ 2. NOW COMPUTE HASH (FILE EXISTS)
-    file_hash = compute_file_hash(file_path)
-
-    # ✅ 3. CHECK FOR DUPLICATES
-    existing = await documents.find_one({
-        "owner_user_id": user_id,
-        "file_hash": file_hash
-    })
+    # ✅ 2. CHECK FOR DUPLICATES (abandoned claims don't count)
+    await release_stale_claims(user_id, file_hash)
+    existing = await find_document_by_hash(
+        {"owner_user_id": user_id}, file.file, file_hash
+    )
 
     if existing:
-        os.remove(file_path)   # ✅ Remove duplicate file
         raise HTTPException(400, "Duplicate document already uploaded")
 
-    # ✅ 4. PROCESS FILE
-    text = extract_text_from_file(file_path)
-    chunks = chunk_text(text)
-    embeddings = embed_texts(chunks)
-
     doc_id = str(ObjectId())
 
-    collection.add(
-        documents=chunks,
-        embeddings=embeddings,
-        ids=[f"{doc_id}_{i}" for i in range(len(chunks))],
-        metadatas=[
+    # ✅ 3. CLAIM THE HASH IN MONGO (unique index closes the concurrent-upload race)
+    try:
+        await documents.insert_one({
+            "_id": ObjectId(doc_id),
+            "filename": file.filename,
+            "doc_type": "user",
+            "owner_user_id": user_id,
+            "path": file_path,
+            "size_kb": round(size_mb * 1024, 1),
+            "file_hash_b3": file_hash,
+            "status": "indexing",
+            "claimed_at": datetime.utcnow(),
+            "uploaded_at": datetime.utcnow().isoformat()
+        })
+    except DuplicateKeyError:
+        raise HTTPException(400, "Duplicate document already uploaded")
+
+    chunk_ids = []
+    try:
+        # ✅ 4. SAVE FILE (new documents only)
+        await asyncio.to_thread(_save_sync, file.file, file_path)
+
+        # ✅ 5. PROCESS FILE
+        chunks = await asyncio.to_thread(_extract_chunks_sync, file_path)
+        embeddings = await asyncio.to_thread(embed_texts, chunks)
+
+        chunk_ids = [f"{doc_id}_{i}" for i in range(len(chunks))]
+        await asyncio.to_thread(
+            collection.add,
+            documents=chunks,
+            embeddings=embeddings,
+            ids=chunk_ids,
+            metadatas=[
+                {
+                    "doc_id": doc_id,
+                    "user_id": str(user_id),  # ✅ Always string
+                    "doc_type": "user"
+                }
+            ] * len(chunks)
+        )
+
+        # Lets delete_resource remove chunks by id instead of a metadata scan
+        await documents.update_one(
+            {"_id": ObjectId(doc_id)},
             {
-                "doc_id": doc_id,
-                "user_id": str(user_id),  # ✅ Always string
-                "doc_type": "user"
+                "$set": {"chunk_count": len(chunks), "status": "ready"},
+                "$unset": {"claimed_at": ""}
             }
-            for _ in range(len(chunks))
-        ]
-    )
-
-    # ✅ 5. SAVE METADATA IN MONGO
-    await documents.insert_one({
-        "_id": ObjectId(doc_id),
-        "filename": file.filename,
-        "doc_type": "user",
-        "owner_user_id": user_id,
-        "path": file_path,
-        "size_kb": round(os.path.getsize(file_path) / 1024, 1),
-        "file_hash": file_hash,
-        "uploaded_at": datetime.utcnow().isoformat()
-    })
+        )
+    except Exception:
+        # Undo everything done so far and release the claim so the user can retry
+        if chunk_ids:
+            await asyncio.to_thread(collection.delete, ids=chunk_ids)
+        await asyncio.to_thread(_remove_file_sync, file_path)
+        await documents.delete_one({"_id": ObjectId(doc_id)})
+        raise
 
     return {"message": "Document uploaded & indexed"}
 
@@ -161,13 +319,21 @@ async def delete_resource(
     if doc["owner_user_id"] != user_id:
         raise HTTPException(403, "Not allowed")
 
-    if os.path.exists(doc["path"]):
-        os.remove(doc["path"])
+    await asyncio.to_thread(_remove_file_sync, doc["path"])
 
-    # ✅ Remove from vector DB
-    collection.delete(where={"doc_id": doc_id})
+    # ✅ Remove from vector DB (chunk ids are "{doc_id}_{i}")
+    if "chunk_count" in doc:
+        if doc["chunk_count"]:
+            await asyncio.to_thread(
+                collection.delete,
+                ids=[f"{doc_id}_{i}" for i in range(doc["chunk_count"])]
+            )
+    else:
+        # Documents uploaded before chunk_count was recorded
+        await asyncio.to_thread(collection.delete, where={"doc_id": doc_id})
 
     await documents.delete_one({"_id": ObjectId(doc_id)})
+    invalidate_filename_cache(doc_id)
 
     return {"message": "Document deleted"}
 
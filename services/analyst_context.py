@@ -1,10 +1,29 @@
 # analyst_context.py
 import os
+import ahocorasick
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from typing import Dict, List, Optional, Tuple
 
-# Make path robust regardless of where app is started from
-BASE_DATA_DIR = "./data"
+# Single data-root definition shared with the tail reader
+from services.metrics_store import BASE_DATA_DIR, load_tail
+
+# Only the metric columns the summary reads (city/cell_id are added per scope)
+SUMMARY_COLUMNS = (
+    "timestamp",
+    "latency_ms", "throughput_mbps", "packet_loss_pct", "users_connected",
+)
+
+
+# Topology cache, invalidated when BASE_DATA_DIR or any city dir changes
+_TOPO_CACHE: Dict[str, object] = {"key": None, "data": {}}
+
+
+def _topology_cache_key() -> Tuple:
+    base_mtime = os.stat(BASE_DATA_DIR).st_mtime_ns
+    city_dirs = _TOPO_CACHE.get("city_dirs", [])
+    return (base_mtime,) + tuple(os.stat(d).st_mtime_ns for d in city_dirs)
 
 
 def _discover_topology() -> Dict[str, List[str]]:
@@ -14,28 +33,66 @@ def _discover_topology() -> Dict[str, List[str]]:
       "Bangalore": ["BLR_C1", "BLR_C2", ...],
       ...
     }
+    The scan is cached and only redone when a directory mtime changes.
     """
-    topology: Dict[str, List[str]] = {}
-
     if not os.path.exists(BASE_DATA_DIR):
         print(f"Data directory {BASE_DATA_DIR} does not exist.")
-        return topology
+        return {}
 
-    for city in os.listdir(BASE_DATA_DIR):
-        city_dir = os.path.join(BASE_DATA_DIR, city)
-        if not os.path.isdir(city_dir):
-            continue
+    try:
+        key = _topology_cache_key()
+    except FileNotFoundError:
+        key = None  # a cached city dir disappeared → rescan
 
-        cell_ids: List[str] = []
-        for fname in os.listdir(city_dir):
-            if fname.endswith(".csv"):
-                cell_ids.append(fname.replace(".csv", ""))
-        if cell_ids:
-            topology[city] = cell_ids
+    if key is not None and key == _TOPO_CACHE["key"]:
+        return _TOPO_CACHE["data"]
+
+    topology: Dict[str, List[str]] = {}
+    city_dirs: List[str] = []
+    # mtimes taken before each scan so a concurrent change triggers a rescan next time
+    mtimes = [os.stat(BASE_DATA_DIR).st_mtime_ns]
+
+    with os.scandir(BASE_DATA_DIR) as cities:
+        for city in cities:
+            if not city.is_dir():
+                continue
+            city_dirs.append(city.path)
+            mtimes.append(os.stat(city.path).st_mtime_ns)
+
+            with os.scandir(city.path) as files:
+                cell_ids = [
+                    f.name[: -len(".csv")] for f in files if f.name.endswith(".csv")
+                ]
+            if cell_ids:
+                topology[city.name] = cell_ids
+
+    _TOPO_CACHE["city_dirs"] = city_dirs
+    _TOPO_CACHE["key"] = tuple(mtimes)
+    _TOPO_CACHE["data"] = topology
 
     return topology
 
 
+# Scope-matching automaton, rebuilt whenever _discover_topology returns a new mapping
+_SCOPE_AUTOMATON: Dict[str, object] = {"topology": None, "automaton": None}
+
+
+def _scope_automaton(topology: Dict[str, List[str]]) -> "ahocorasick.Automaton":
+    if _SCOPE_AUTOMATON["topology"] is topology:
+        return _SCOPE_AUTOMATON["automaton"]
+
+    automaton = ahocorasick.Automaton()
+    for city, cells in topology.items():
+        automaton.add_word(city.lower(), ("city", city, None))
+        for cid in cells:
+            automaton.add_word(cid.lower(), ("cell", city, cid))
+    automaton.make_automaton()
+
+    _SCOPE_AUTOMATON["topology"] = topology
+    _SCOPE_AUTOMATON["automaton"] = automaton
+    return automaton
+
+
 def _infer_scope_from_query(
     user_query: Optional[str],
     topology: Dict[str, List[str]]
@@ -45,28 +102,24 @@ def _infer_scope_from_query(
     If we find a cell, we also fix the city to the one that owns that cell.
     Returns (city or None, cell_id or None).
     """
-    if not user_query:
+    if not user_query or not topology:
         return None, None
 
     q = user_query.lower()
 
-    # 1) Try to detect city by name
     detected_city: Optional[str] = None
-    for city in topology.keys():
-        if city.lower() in q:
-            detected_city = city
-            break
-
-    # 2) Try to detect a specific cell ID by exact substring (case-insensitive)
     detected_cell: Optional[str] = None
-    for city, cells in topology.items():
-        for cid in cells:
-            if cid.lower() in q:
-                detected_cell = cid
-                detected_city = city  # force-align city if cell is found
-                break
-        if detected_cell:
-            break
+    cell_city: Optional[str] = None
+
+    # Single linear pass over the query for all city names and cell IDs
+    for _, (kind, city, cid) in _scope_automaton(topology).iter(q):
+        if kind == "cell":
+            detected_cell, cell_city = cid, city  # last cell mention wins
+        elif detected_city is None:
+            detected_city = city  # first city mention wins
+
+    if detected_cell:
+        detected_city = cell_city  # force-align city if cell is found
 
     return detected_city, detected_cell
 
@@ -84,7 +137,13 @@ def _load_data_for_scope(
     - Else -> all cells in all cities
     Returns a pandas DataFrame or None if nothing found.
     """
-    rows = []
+    tables: List[pa.Table] = []
+
+    def _tagged(table: pa.Table, c: str, cid: str) -> pa.Table:
+        # Add scope columns; the metric columns are shared, not copied
+        n = table.num_rows
+        table = table.append_column("city", pa.array([c] * n, pa.string()))
+        return table.append_column("cell_id", pa.array([cid] * n, pa.string()))
 
     # Case 1: specific cell
     if cell_id:
@@ -93,15 +152,11 @@ def _load_data_for_scope(
         if cell_id not in city_cells:
             return None
 
-        city_dir = os.path.join(BASE_DATA_DIR, city)
-        path = os.path.join(city_dir, f"{cell_id}.csv")
-        if not os.path.exists(path):
+        table = load_tail(city, cell_id, last_n, SUMMARY_COLUMNS)
+        if table is None:
             return None
 
-        df = pd.read_csv(path).tail(last_n)
-        df["city"] = city
-        df["cell_id"] = cell_id
-        rows.append(df)
+        tables.append(_tagged(table, city, cell_id))
 
     else:
         # Case 2: city-wide or global
@@ -111,33 +166,41 @@ def _load_data_for_scope(
             cities = list(topology.keys())
 
         for c in cities:
-            city_dir = os.path.join(BASE_DATA_DIR, c)
             for cell in topology.get(c, []):
-                path = os.path.join(city_dir, f"{cell}.csv")
-                if not os.path.exists(path):
+                table = load_tail(c, cell, last_n, SUMMARY_COLUMNS)
+                if table is None:
                     continue
-                df = pd.read_csv(path).tail(last_n)
-                df["city"] = c
-                df["cell_id"] = cell
-                rows.append(df)
+                tables.append(_tagged(table, c, cell))
 
-    if not rows:
+    if not tables:
         return None
 
-    return pd.concat(rows, ignore_index=True)
+    # Zero-copy column concatenation, one conversion to pandas at the end
+    return pa.concat_tables(tables).to_pandas()
 
 
-def _classify_health(latency_ms: float, packet_loss: float, users: float) -> str:
+def _classify_health(df: pd.DataFrame) -> np.ndarray:
     """
-    Simple heuristic for text classification of current health.
+    Simple heuristic for text classification of health, evaluated for
+    every row of df at once. Returns one label per row.
     """
-    if latency_ms > 200 or packet_loss > 3:
-        return "Severe degradation (likely incident)."
-    if latency_ms > 80 or packet_loss > 1:
-        return "Degraded performance (monitor closely)."
-    if users > 150 and latency_ms > 50:
-        return "High load, mild congestion."
-    return "Healthy / normal behavior."
+    latency = df["latency_ms"].to_numpy()
+    packet_loss = df["packet_loss_pct"].to_numpy()
+    users = df["users_connected"].to_numpy()
+
+    return np.select(
+        [
+            (latency > 200) | (packet_loss > 3),
+            (latency > 80) | (packet_loss > 1),
+            (users > 150) & (latency > 50),
+        ],
+        [
+            "Severe degradation (likely incident).",
+            "Degraded performance (monitor closely).",
+            "High load, mild congestion.",
+        ],
+        default="Healthy / normal behavior.",
+    )
 
 
 def build_network_summary(user_query: Optional[str] = None) -> str:
@@ -165,13 +228,16 @@ def build_network_summary(user_query: Optional[str] = None) -> str:
     if df is None or df.empty:
         return f"No recent data found for {scope_desc}."
 
-    # Basic aggregates
-    avg_latency = df["latency_ms"].mean()
-    avg_throughput = df["throughput_mbps"].mean()
-    avg_packet_loss = df["packet_loss_pct"].mean()
-    avg_users = df["users_connected"].mean()
+    # Basic aggregates (one pass over the metric columns)
+    stats = df[["latency_ms", "throughput_mbps", "packet_loss_pct", "users_connected"]].mean()
+    avg_latency = stats["latency_ms"]
+    avg_throughput = stats["throughput_mbps"]
+    avg_packet_loss = stats["packet_loss_pct"]
+    avg_users = stats["users_connected"]
 
-    latest = df.sort_values("timestamp").iloc[-1]
+    # O(n) scan for the newest sample instead of a full sort
+    latest_pos = df["timestamp"].to_numpy().argmax()
+    latest = df.iloc[latest_pos]
 
     lines = []
     lines.append(f"Scope: {scope_desc}.")
@@ -191,14 +257,11 @@ def build_network_summary(user_query: Optional[str] = None) -> str:
             avg_throughput=("throughput_mbps", "mean"),
         )
 
-        worst = by_cell.sort_values("avg_latency", ascending=False).head(1)
-        best = by_cell.sort_values("avg_latency", ascending=True).head(1)
-
-        worst_row = worst.iloc[0]
-        best_row = best.iloc[0]
+        worst_city, worst_cell = worst_idx = by_cell["avg_latency"].idxmax()
+        best_city, best_cell = best_idx = by_cell["avg_latency"].idxmin()
 
-        worst_city, worst_cell = worst.index[0]
-        best_city, best_cell = best.index[0]
+        worst_row = by_cell.loc[worst_idx]
+        best_row = by_cell.loc[best_idx]
 
         lines.append(
             f"Worst latency currently at {worst_city}/{worst_cell}: "
@@ -212,11 +275,7 @@ def build_network_summary(user_query: Optional[str] = None) -> str:
         )
 
     # Latest sample insight for the focused scope
-    health = _classify_health(
-        latest["latency_ms"],
-        latest["packet_loss_pct"],
-        latest["users_connected"],
-    )
+    health = _classify_health(df)[latest_pos]
     lines.append(
         "Most recent sample: "
         f"{latest['timestamp']} – latency {latest['latency_ms']:.1f} ms, "
@@ -1,4 +1,5 @@
 import os
+import asyncio
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
@@ -6,11 +7,50 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Make sure GOOGLE_API_KEY is in your env
+# One module-level client, shared by every request
 llm = ChatGoogleGenerativeAI(
     model="gemini-2.5-flash",   # or a stable variant
     temperature=0.1,
+    max_retries=2,
 )
 
+# Max seconds to wait for the next streamed chunk. Deliberately not passed as
+# the client's `timeout`: that one is a total deadline for the whole response
+# and would cut off long answers.
+LLM_READ_TIMEOUT = 30
+
+
+async def astream_with_read_timeout(messages):
+    stream = llm.astream(messages)
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(stream.__anext__(), LLM_READ_TIMEOUT)
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        await stream.aclose()
+
+
+# Startup must not wait on retries during a Gemini outage
+LLM_WARMUP_TIMEOUT = 5
+
+
+async def warmup_llm():
+    # Best-effort: set up the HTTP connection before the first user request
+    # needs it. Never fails startup; auth/data/resources don't need the LLM.
+    if not os.getenv("GOOGLE_API_KEY"):
+        print("⚠️ GOOGLE_API_KEY is not set; chat requests will fail")
+        return
+    try:
+        await asyncio.wait_for(
+            llm.ainvoke([HumanMessage(content="ping")]), LLM_WARMUP_TIMEOUT
+        )
+    except Exception as e:
+        print(f"⚠️ LLM warmup failed: {type(e).__name__}: {e}")
+
+
 def build_system_prompt(mode: str):
     if mode == "knowledge":
         return (
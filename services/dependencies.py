@@ -1,3 +1,6 @@
+import hashlib
+
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -9,6 +12,20 @@ from utils.auth_utils import SECRET_KEY, ALGORITHM
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# token digest -> UserPublic, so authenticated requests skip the users lookup
+_USER_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def invalidate_user_cache(email: str):
+    """Drop cached users for this email (call after password/role changes)."""
+    for key, user in list(_USER_CACHE.items()):
+        if user.email == email:
+            _USER_CACHE.pop(key, None)
+
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserPublic:
     credentials_exception = HTTPException(
@@ -26,13 +43,22 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserPublic:
     except JWTError:
         raise credentials_exception
 
+    # Signature/expiry are always verified above; only the DB lookup is cached
+    key = _token_key(token)
+    cached = _USER_CACHE.get(key)
+    if cached is not None and cached.email == token_data.email:
+        return cached
+
     user = await users_collection.find_one({"email": token_data.email})
     if user is None:
         raise credentials_exception
 
-    return UserPublic(
+    current_user = UserPublic(
         id=str(user["_id"]),
         name=user["name"],
         email=user["email"],
         role=user.get("role", "operator"),
     )
+    _USER_CACHE[key] = current_user
+
+    return current_user
@@ -0,0 +1,57 @@
+# metrics_store.py
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import pyarrow as pa
+
+from utils.csv_utils import tail_csv
+
+BASE_DATA_DIR = "./data"
+
+# Column layout written by generator/live_node_generator.py
+METRICS_SCHEMA = pa.schema([
+    ("timestamp", pa.string()),
+    ("city", pa.string()),
+    ("cell_id", pa.string()),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("throughput_mbps", pa.float64()),
+    ("latency_ms", pa.float64()),
+    ("packet_loss_pct", pa.float64()),
+    ("rsrp_dbm", pa.float64()),
+    ("users_connected", pa.int64()),
+])
+
+
+@lru_cache(maxsize=64)
+def _load_tail_cached(
+    path: str, mtime_ns: int, n: int, columns: Optional[Tuple[str, ...]]
+) -> pa.Table:
+    # mtime_ns is part of the key so appends by the generator invalidate the entry
+    schema = (
+        pa.schema([METRICS_SCHEMA.field(c) for c in columns]) if columns else METRICS_SCHEMA
+    )
+    # Unwanted fields are skipped before any int/float conversion
+    return pa.Table.from_pylist(tail_csv(path, n, columns=columns), schema=schema)
+
+
+def load_tail(
+    city: str,
+    cell_id: str,
+    n: int,
+    columns: Optional[Tuple[str, ...]] = None,
+) -> Optional[pa.Table]:
+    """
+    Return the last n samples for a cell as an Arrow table (METRICS_SCHEMA,
+    or just `columns` of it), or None if the cell has no data file.
+    Only the tail of <cell>.csv is read. Tables are immutable, so the cached
+    result is shared safely.
+    """
+    path = os.path.join(BASE_DATA_DIR, city, f"{cell_id}.csv")
+
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _load_tail_cached(path, mtime_ns, n, columns)
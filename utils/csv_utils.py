@@ -0,0 +1,58 @@
+import csv
+import os
+from typing import Iterable, Optional
+
+
+def _parse_value(value: str):
+    # Match pandas' inference for the metric CSVs: int, then float, else text
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def tail_csv(
+    path: str,
+    n: int = 200,
+    block_size: int = 1 << 16,
+    columns: Optional[Iterable[str]] = None,
+) -> list[dict]:
+    """
+    Return the last n rows of a CSV file as dicts keyed by its header,
+    reading backwards from the end so cost is bounded by n, not file size.
+    If columns is given, only those fields are parsed into each dict.
+    """
+    with open(path, "rb") as f:
+        header = next(csv.reader([f.readline().decode("utf-8")]), [])
+        header_end = f.tell()
+
+        pos = f.seek(0, os.SEEK_END)
+        data = b""
+
+        # Need n+1 newlines: the first line of the buffer may be partial
+        while pos > header_end and data.count(b"\n") <= n:
+            size = min(block_size, pos - header_end)
+            pos -= size
+            f.seek(pos)
+            data = f.read(size) + data
+
+    lines = data.splitlines()
+    if pos > header_end:
+        lines = lines[1:]
+
+    last_lines = [line.decode("utf-8") for line in lines if line][-n:]
+
+    wanted = None if columns is None else set(columns)
+    fields = [
+        (i, name) for i, name in enumerate(header)
+        if wanted is None or name in wanted
+    ]
+
+    return [
+        {name: _parse_value(row[i]) for i, name in fields if i < len(row)}
+        for row in csv.reader(last_lines)
+    ]
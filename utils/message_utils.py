@@ -1,6 +1,8 @@
 def compress_message(content: str, max_len: int = 200) -> str:
     # Simple heuristic: truncate; later you can use Gemini to summarize
-    content = content.strip().replace("\n", " ")
+    # strip() returns the same object when there is nothing to strip, and the
+    # newline replace only runs on the part that survives truncation.
+    content = content.strip()
     if len(content) <= max_len:
-        return content
-    return content[: max_len - 3] + "..."
+        return content.replace("\n", " ")
+    return content[: max_len - 3].replace("\n", " ") + "..."